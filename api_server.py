@@ -1,7 +1,10 @@
 """FastAPI server for RAG pipeline"""
 
+import asyncio
+import os
 import sys
 import time
+from collections import OrderedDict
 from pathlib import Path
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -47,59 +50,191 @@ class QueryResponse(BaseModel):
     confidence: float | None = None
     processing_time: float | None = None
 
+class BatchedEmbedder:
+    """Coalesce concurrent query-embed calls into single model forwards"""
+
+    def __init__(self, embedder: LocalEmbedder, max_batch: int = 32, max_wait_ms: float = 20.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Start the background batching task (call from within the event loop)"""
+        self._task = asyncio.get_running_loop().create_task(self._batcher())
+
+    async def embed(self, text: str) -> list[float]:
+        """Embed a single text, sharing a forward pass with concurrent callers"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def _batcher(self):
+        """Drain up to max_batch queued requests within max_wait and embed them together"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in items]
+            try:
+                embeddings = await asyncio.to_thread(
+                    self.embedder.embed_chunks, texts, len(texts), False
+                )
+                for (_, future), embedding in zip(items, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+# Response caches: exact-match LRU on the normalized question plus a small
+# semantic tier that reuses answers for near-duplicate queries
+QUERY_CACHE_MAX = 256
+SEMANTIC_CACHE_THRESHOLD = 0.97
+query_cache: "OrderedDict[str, QueryResponse]" = OrderedDict()
+semantic_cache_embeddings: list[np.ndarray] = []
+semantic_cache_responses: list[QueryResponse] = []
+cache_lock = asyncio.Lock()
+
+# Bound concurrent LLM forwards so parallel requests can't exhaust GPU memory
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+generate_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+async def cache_lookup(cache_key: str) -> QueryResponse | None:
+    """Exact-match cache lookup, refreshing LRU order on hit"""
+    async with cache_lock:
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            query_cache.move_to_end(cache_key)
+        return cached
+
+
+async def semantic_cache_lookup(question_embedding: np.ndarray) -> QueryResponse | None:
+    """Reuse a previous answer if its question embedding is close enough"""
+    async with cache_lock:
+        if not semantic_cache_embeddings:
+            return None
+        sims = np.stack(semantic_cache_embeddings) @ question_embedding
+        best = int(np.argmax(sims))
+        if float(sims[best]) >= SEMANTIC_CACHE_THRESHOLD:
+            return semantic_cache_responses[best]
+        return None
+
+
+async def cache_store(cache_key: str, question_embedding: np.ndarray, response: QueryResponse):
+    """Insert a response into both cache tiers, evicting oldest entries"""
+    async with cache_lock:
+        query_cache[cache_key] = response
+        query_cache.move_to_end(cache_key)
+        while len(query_cache) > QUERY_CACHE_MAX:
+            query_cache.popitem(last=False)
+
+        semantic_cache_embeddings.append(question_embedding)
+        semantic_cache_responses.append(response)
+        while len(semantic_cache_embeddings) > QUERY_CACHE_MAX:
+            semantic_cache_embeddings.pop(0)
+            semantic_cache_responses.pop(0)
+
+
 # Initialize components (loaded once at startup)
 embedder: LocalEmbedder | None = None
+batched_embedder: BatchedEmbedder | None = None
 retriever: LocalRetriever | None = None
 llm_generator: LocalLLMGenerator | None = None
 chunks_df: pd.DataFrame | None = None
+# Columnar chunk metadata; the retriever returns indices into these arrays
+chunk_texts: np.ndarray | None = None
+chunk_pages: np.ndarray | None = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize RAG components on startup"""
-    global embedder, retriever, llm_generator, chunks_df
+    global embedder, batched_embedder, retriever, llm_generator, chunks_df
+    global chunk_texts, chunk_pages
     
     try:
         logger.info("=" * 80)
         logger.info("INITIALIZING RAG API SERVER")
         logger.info("=" * 80)
-        
+
+        # Let the retrieval GEMV use all cores
+        torch.set_num_threads(os.cpu_count() or 1)
+
         # Load embeddings and chunks from CSV
         csv_path = Path(__file__).parent / "rag_llm_app/data/documents/text_chunks_and_embeddings_df.csv"
         if not csv_path.exists():
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
         
+        # Prefer the binary embedding matrix written by ingest.py - np.load with
+        # mmap avoids parsing the string-encoded CSV column row by row
+        npy_path = Path(__file__).parent / "rag_llm_app/data/documents/text_chunks_and_embeddings.npy"
+
+        # Only parse the columns the server needs; the embedding column is
+        # skipped entirely when the binary matrix is available. pyarrow's
+        # multithreaded reader is used when installed.
+        usecols = ['sentence_chunk', 'page_number']
+        if not npy_path.exists():
+            usecols.append('embedding')
+        read_kwargs = {'usecols': usecols, 'dtype': {'page_number': 'int32'}}
+
         logger.info(f"Loading chunks from {csv_path}")
-        chunks_df = pd.read_csv(csv_path)
+        try:
+            chunks_df = pd.read_csv(csv_path, engine='pyarrow', **read_kwargs)
+        except (ImportError, ValueError):
+            chunks_df = pd.read_csv(csv_path, **read_kwargs)
         logger.info(f"Loaded {len(chunks_df)} chunks")
-        
-        # Convert embeddings from string representation to numpy arrays
-        embeddings_list = []
-        for emb_str in chunks_df['embedding']:
-            emb_array = np.array(eval(emb_str))
-            embeddings_list.append(emb_array)
-        
-        embeddings_tensor = torch.tensor(
-            np.array(embeddings_list),
-            dtype=torch.float32
-        )
+
+        if npy_path.exists():
+            logger.info(f"Loading embedding matrix from {npy_path}")
+            emb_matrix = np.load(npy_path, mmap_mode='r')
+            # Ingest stores pre-normalized float16 rows; keep half precision on
+            # GPU, upcast on CPU where float32 matmul is the fast path
+            dtype = np.float16 if torch.cuda.is_available() else np.float32
+            embeddings_tensor = torch.from_numpy(
+                np.ascontiguousarray(emb_matrix, dtype=dtype)
+            )
+        else:
+            # Fallback for older ingests that only produced the CSV.
+            # np.fromstring parses the comma-separated floats in C - roughly an
+            # order of magnitude faster than literal_eval per row
+            logger.info("No .npy matrix found, parsing embeddings from CSV")
+            embeddings_tensor = torch.from_numpy(
+                np.stack([
+                    np.fromstring(emb_str.strip()[1:-1], sep=',', dtype=np.float32)
+                    for emb_str in chunks_df['embedding']
+                ])
+            )
+            # Normalize here so retrieval is a plain dot product, matching the
+            # pre-normalized .npy path
+            embeddings_tensor = torch.nn.functional.normalize(embeddings_tensor, dim=1)
         logger.info(f"Embeddings tensor shape: {embeddings_tensor.shape}")
 
-        # Build chunks list for retriever
-        chunks_list = []
-        for _, row in chunks_df.iterrows():
-            chunks_list.append({
-                'sentence_chunk': row.get('sentence_chunk', ''),
-                'page_number': int(row.get('page_number', 0)),
-                # Optional source label for UI
-                'source': f"Page {int(row.get('page_number', 0))}"
-            })
+        # Keep chunk metadata as two parallel columns; only the retrieved
+        # top-k rows ever get materialized into Python dicts
+        chunk_texts = chunks_df.get('sentence_chunk', pd.Series(dtype=str)).fillna('').astype(str).to_numpy()
+        chunk_pages = chunks_df.get('page_number', pd.Series(dtype=int)).fillna(0).astype(int).to_numpy()
 
         # Initialize components
         logger.info("Initializing LocalEmbedder...")
         embedder = LocalEmbedder()
+        batched_embedder = BatchedEmbedder(embedder)
+        batched_embedder.start()
 
         logger.info("Initializing LocalRetriever...")
-        retriever = LocalRetriever(embeddings_tensor, chunks_list)
+        retriever = LocalRetriever(embeddings_tensor)
 
         logger.info("Initializing LocalLLMGenerator...")
         llm_generator = LocalLLMGenerator()
@@ -135,30 +270,50 @@ async def query(request: QueryRequest):
         raise HTTPException(status_code=400, detail="Question is required")
     
     start_time = time.time()
-    
+
     try:
         logger.info(f"Processing query: {request.question}")
-        
-        if embedder is None or retriever is None or llm_generator is None:
+
+        if batched_embedder is None or retriever is None or llm_generator is None:
             raise RuntimeError("RAG components not initialized")
-        
-        # 1. Embed the question
+
+        # 0. Exact-match cache: skip the whole pipeline on repeat questions
+        cache_key = request.question.strip().lower()
+        cached = await cache_lookup(cache_key)
+        if cached is not None:
+            logger.info("Returning exact-match cached response")
+            return cached
+
+        # 1. Embed the question (batched with concurrent requests)
         logger.info("Embedding question...")
-        question_embeddings = embedder.embed_chunks([request.question], batch_size=1)
-        question_embedding = question_embeddings[0]  # Get the first (and only) embedding
+        question_embedding = np.asarray(
+            await batched_embedder.embed(request.question), dtype=np.float32
+        )
+        # Corpus rows are unit-length, so normalize the query too and let the
+        # retriever's dot product act as cosine similarity
+        question_embedding /= max(float(np.linalg.norm(question_embedding)), 1e-12)
+
+        # 1b. Semantic cache: reuse the answer for near-duplicate questions
+        cached = await semantic_cache_lookup(question_embedding)
+        if cached is not None:
+            logger.info("Returning semantic-cache response")
+            return cached
         
-        # 2. Retrieve relevant chunks using the search method
+        # 2. Retrieve top-k indices (off the event loop) and resolve only those
+        # rows from the columnar metadata
         logger.info("Retrieving relevant chunks...")
         top_k = 5
-        retrieved_results = retriever.search(question_embedding, top_k=top_k)
-        
-        # Convert results to our response format
+        scores, indices = await asyncio.to_thread(
+            retriever.search_indices, question_embedding, top_k
+        )
+
         retrieved_chunks = []
-        for result in retrieved_results:
+        for idx in indices.tolist():
+            page = int(chunk_pages[idx])
             retrieved_chunks.append({
-                'content': result.get('sentence_chunk', ''),
-                'page': int(result.get('page_number', 0)),
-                'source': f"Page {result.get('page_number', 0)}",
+                'content': chunk_texts[idx],
+                'page': page,
+                'source': f"Page {page}",
             })
         
         logger.info(f"Retrieved {len(retrieved_chunks)} relevant chunks")
@@ -168,28 +323,34 @@ async def query(request: QueryRequest):
             chunk['content'] for chunk in retrieved_chunks
         ])
         
-        # 4. Generate answer using LLM
+        # 4. Generate answer using LLM in a worker thread so the event loop
+        # keeps serving other requests during the forward pass
         logger.info("Generating answer with LLM...")
-        answer = llm_generator.generate(
-            query=request.question,
-            context=context_text
-        )
+        async with generate_semaphore:
+            answer = await asyncio.to_thread(
+                llm_generator.generate,
+                request.question,
+                context_text,
+            )
         
         processing_time = time.time() - start_time
         logger.info(f"Query processed in {processing_time:.2f}s")
         
-        # Build response
+        # Build response - model_construct skips per-field validation, which is
+        # safe here because every field comes from our own pipeline
         sources = [
-            Source(page=chunk['page'], source=chunk['source'])
+            Source.model_construct(page=chunk['page'], source=chunk['source'])
             for chunk in retrieved_chunks
         ]
-        
-        return QueryResponse(
+
+        response = QueryResponse.model_construct(
             answer=answer,
             sources=sources,
             confidence=0.8,  # Could be calculated based on retrieval scores
             processing_time=processing_time,
         )
+        await cache_store(cache_key, question_embedding, response)
+        return response
         
     except Exception as e:
         logger.error(f"Error processing query: {e}", exc_info=True)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Export the local embedding model to ONNX for faster CPU inference
+
+Writes the model + tokenizer into the directory that LocalEmbedder reads
+when USE_ONNX_EMBEDDER=true (see ONNX_EMBEDDING_MODEL_DIR in settings).
+"""
+import sys
+from pathlib import Path
+
+# Add rag_llm_app to path for settings
+sys.path.insert(0, str(Path(__file__).parent / "rag_llm_app"))
+
+from app.config import settings
+
+
+def main():
+    try:
+        from optimum.exporters.onnx import main_export
+    except ImportError:
+        print("❌ optimum is required for the export: pip install optimum[exporters]")
+        sys.exit(1)
+
+    model_id = f"sentence-transformers/{settings.LOCAL_EMBEDDING_MODEL}"
+    output_dir = Path(settings.ONNX_EMBEDDING_MODEL_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Exporting {model_id} to {output_dir}...")
+    main_export(
+        model_name_or_path=model_id,
+        output=output_dir,
+        task="feature-extraction",
+    )
+
+    print(f"✅ ONNX model exported to {output_dir}")
+
+    # Dynamic INT8 quantization: 4x smaller weights and int8 GEMMs on CPUs
+    # with VNNI; LocalEmbedder prefers model_int8.onnx when it exists
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        int8_path = output_dir / "model_int8.onnx"
+        print(f"Quantizing to INT8: {int8_path}...")
+        quantize_dynamic(
+            str(output_dir / "model.onnx"),
+            str(int8_path),
+            weight_type=QuantType.QInt8,
+        )
+        print(f"✅ INT8 model written to {int8_path}")
+    except ImportError:
+        print("⚠️  onnxruntime.quantization unavailable, skipping INT8 quantization")
+    except Exception as e:
+        print(f"⚠️  INT8 quantization failed ({e}), the FP32 model will be used")
+
+    print("   Enable the ONNX backend with USE_ONNX_EMBEDDER=true in your .env")
+
+
+if __name__ == "__main__":
+    main()
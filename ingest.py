@@ -1,6 +1,9 @@
 import os, uuid, re, sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 import fitz  # PyMuPDF
+import numpy as np
 import tiktoken
 from supabase import create_client, Client
 from tqdm import tqdm
@@ -18,6 +21,7 @@ SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
 
 # ---- Config
 PDF_PATH = "rag_llm_app/data/documents/Human-Nutrition-2020-Edition-1598491699.pdf"
+EMBEDDINGS_NPY_PATH = "rag_llm_app/data/documents/text_chunks_and_embeddings.npy"
 DOC_ID = "nutrition-v1"
 EMBED_MODEL = "text-embedding-3-small"
 BATCH_EMBED = 100
@@ -31,18 +35,24 @@ MIN_TOKENS = 50
 
 enc = tiktoken.get_encoding("cl100k_base")
 
+# Compiled once: clean_text/split_sentences run per page in the workers
+_RE_HYPHEN = re.compile(r"-\s*\n\s*")
+_RE_WSNL = re.compile(r"\s+\n")
+_RE_WS = re.compile(r"[ \t]+")
+_RE_SENT = re.compile(r'(?<=[.!?])\s+')
+
 def clean_text(t: str) -> str:
     # normalize whitespace and fix hyphenation across line breaks
     t = t.replace("\r", " ")
-    t = re.sub(r"-\s*\n\s*", "", t)  # join "nutri-\n tion" => "nutrition"
-    t = re.sub(r"\s+\n", "\n", t)
-    t = re.sub(r"[ \t]+", " ", t)
+    t = _RE_HYPHEN.sub("", t)  # join "nutri-\n tion" => "nutrition"
+    t = _RE_WSNL.sub("\n", t)
+    t = _RE_WS.sub(" ", t)
     t = t.replace("\n", " ").strip()
     return t
 
 def split_sentences(text: str):
     # simple sentence splitter (good for prose)
-    sents = re.split(r'(?<=[.!?])\s+', text.strip())
+    sents = _RE_SENT.split(text.strip())
     return [s.strip() for s in sents if s.strip()]
 
 def chunk_page_by_sentences(text: str,
@@ -51,42 +61,59 @@ def chunk_page_by_sentences(text: str,
                              max_tokens: int = MAX_TOKENS,
                              min_tokens: int = MIN_TOKENS):
     sents = split_sentences(text)
+    if not sents:
+        return
+
+    # Tokenize each sentence once; window sizing then works on cumulative
+    # counts instead of re-encoding the joined chunk on every shrink
+    sent_lens = [len(ids) for ids in enc.encode_batch(sents)]
     i = 0
     step = max(1, sents_per_chunk - overlap)
-    
+
     while i < len(sents):
-        piece = sents[i:i + sents_per_chunk]
-        if not piece:
-            break
-        
-        chunk = " ".join(piece)
-        
+        k = min(sents_per_chunk, len(sents) - i)
+
         # enforce token ceiling
-        ids = enc.encode(chunk)
-        while max_tokens and len(ids) > max_tokens and len(piece) > 1:
-            piece = piece[:-1]
-            chunk = " ".join(piece)
-            ids = enc.encode(chunk)
-            
-        if len(ids) >= min_tokens:
-            yield chunk
-            
+        total = sum(sent_lens[i:i + k])
+        while max_tokens and total > max_tokens and k > 1:
+            k -= 1
+            total -= sent_lens[i + k]
+
+        if total >= min_tokens:
+            # Emit the token count too so callers don't recount at save time
+            yield " ".join(sents[i:i + k]), total
+
         i += step
 
-def pdf_pages(path: str):
-    """Yield (page_number_1based, cleaned_text)."""
+def _extract_page_range(path: str, start: int, stop: int):
+    # Worker: each process opens its own document (fitz handles are not
+    # fork-safe to share across processes)
     doc = fitz.open(path)
     try:
-        for i in range(len(doc)):
-            txt = doc[i].get_text("text") or ""
-            yield (i + 1, clean_text(txt))
+        return [
+            (i + 1, clean_text(doc[i].get_text("text") or ""))
+            for i in range(start, stop)
+        ]
     finally:
         doc.close()
 
+def pdf_pages(path: str, pages_per_task: int = 32):
+    """Yield (page_number_1based, cleaned_text), extracting ranges in parallel."""
+    doc = fitz.open(path)
+    n_pages = len(doc)
+    doc.close()
+
+    starts = list(range(0, n_pages, pages_per_task))
+    stops = [min(s + pages_per_task, n_pages) for s in starts]
+
+    with ProcessPoolExecutor() as ex:
+        for batch in ex.map(partial(_extract_page_range, path), starts, stops):
+            yield from batch
+
 def main():
     # Check if Supabase credentials are provided
     use_supabase = bool(SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY)
-    
+
     if use_supabase:
         print("Using Supabase for storage")
         sb: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
@@ -94,85 +121,118 @@ def main():
         sb.table("chunks").delete().eq("doc_id", DOC_ID).execute()
     else:
         print("Supabase credentials not found, will save to CSV only")
-    
-    print("Reading PDF by pages...")
-    pages = list(pdf_pages(PDF_PATH))
-    print(f"📄 Loaded {len(pages)} pages from PDF")
-    
-    # Build chunks with page metadata
-    inputs, metas = [], []
+
+    import pandas as pd
+    csv_path = "rag_llm_app/data/documents/text_chunks_and_embeddings_df.csv"
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+
+    embedder = LocalEmbedder()
+
+    # Stream pages -> chunks -> embedding batches so only one batch of text
+    # and its vectors are in memory at a time (the kept embeddings are tiny
+    # float16 rows); CSV metadata is appended batch by batch as well
+    total_chunks = 0
+    total_pages = 0
     empty_pages = 0
     pages_with_chunks = 0
+    batch_texts, batch_pages, batch_token_counts = [], [], []
+    emb_batches = []
+    supabase_error = None
+    csv_started = False
+
+    def flush_batch():
+        nonlocal total_chunks, csv_started, supabase_error
+        if not batch_texts:
+            return
+        vectors = embedder.embed_chunks(batch_texts, batch_size=BATCH_EMBED, show_progress=False)
+
+        # Keep a normalized float16 copy for the binary matrix
+        arr = np.asarray(vectors, dtype=np.float32)
+        arr /= np.maximum(np.linalg.norm(arr, axis=1, keepdims=True), 1e-12)
+        emb_batches.append(arr.astype(np.float16))
+
+        # Append metadata + stringified embeddings to the CSV
+        df = pd.DataFrame({
+            "sentence_chunk": batch_texts,
+            "page_number": batch_pages,
+            "chunk_token_count": batch_token_counts,
+            "embedding": [str(v) for v in vectors.tolist()],
+        })
+        df.to_csv(csv_path, index=False, mode="w" if not csv_started else "a", header=not csv_started)
+        csv_started = True
+
+        if use_supabase and supabase_error is None:
+            rows = [
+                {
+                    "doc_id": DOC_ID,
+                    "chunk_index": total_chunks + i,
+                    "content": content,
+                    "metadata": {"source": PDF_PATH, "page": page},
+                    # JSON boundary: ndarray rows are not serializable
+                    "embedding": emb.tolist(),
+                }
+                for i, (content, page, emb) in enumerate(zip(batch_texts, batch_pages, vectors))
+            ]
+            try:
+                for j in range(0, len(rows), BATCH_INSERT):
+                    sb.table("chunks").insert(rows[j:j + BATCH_INSERT]).execute()
+            except Exception as e:
+                supabase_error = e
+
+        total_chunks += len(batch_texts)
+        batch_texts.clear()
+        batch_pages.clear()
+        batch_token_counts.clear()
+
+    print("Reading PDF by pages...")
     print(f"Chunking ({SENTS_PER_CHUNK} sentences per chunk, {SENT_OVERLAP} overlap, min {MIN_TOKENS} tokens)...")
-    
-    for page_num, text in pages:
+
+    for page_num, text in tqdm(pdf_pages(PDF_PATH), desc="Ingesting pages"):
+        total_pages += 1
         if not text:
             empty_pages += 1
             continue
-        
+
         page_chunks = 0
-        for chunk in chunk_page_by_sentences(text):
-            inputs.append(chunk)
-            metas.append({"source": PDF_PATH, "page": page_num})
+        for chunk, n_tokens in chunk_page_by_sentences(text):
+            batch_texts.append(chunk)
+            batch_pages.append(page_num)
+            batch_token_counts.append(n_tokens)
             page_chunks += 1
-        
+            if len(batch_texts) >= BATCH_EMBED:
+                flush_batch()
+
         if page_chunks > 0:
             pages_with_chunks += 1
-            
-    print(f"✅ Built {len(inputs)} chunks from {len(pages)} pages")
+
+    flush_batch()
+
+    print(f"✅ Built {total_chunks} chunks from {total_pages} pages")
     print(f"   - Pages with text: {pages_with_chunks}")
     print(f"   - Empty pages skipped: {empty_pages}")
-    print(f"   - Pages with text but no chunks (< {MIN_TOKENS} tokens): {len(pages) - empty_pages - pages_with_chunks}")
-    
-    # Generate embeddings using local model
-    print("Generating embeddings with local model (all-mpnet-base-v2)...")
-    embedder = LocalEmbedder()
-    vectors = embedder.embed_chunks(inputs, batch_size=BATCH_EMBED, show_progress=True)
-        
-    # Prepare rows
-    rows = []
-    for idx, (content, emb, meta) in enumerate(zip(inputs, vectors, metas)):
-        rows.append({
-            "doc_id": DOC_ID,
-            "chunk_index": idx,
-            "content": content,
-            "metadata": meta,      # contains {source, page}
-            "embedding": emb
-        })
-    
-    # Save to CSV for local use
-    import pandas as pd
-    csv_path = "rag_llm_app/data/documents/text_chunks_and_embeddings_df.csv"
-    df = pd.DataFrame([
-        {
-            "sentence_chunk": row["content"],
-            "page_number": row["metadata"]["page"],
-            "chunk_token_count": len(row["content"].split()),
-            "embedding": str(row["embedding"])  # Store as string representation
-        }
-        for row in rows
-    ])
-    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-    df.to_csv(csv_path, index=False)
-    print(f"✅ Saved {len(rows)} chunks to {csv_path}")
-    
-    # Upload to Supabase if credentials are available
+    print(f"   - Pages with text but no chunks (< {MIN_TOKENS} tokens): {total_pages - empty_pages - pages_with_chunks}")
+    print(f"✅ Saved {total_chunks} chunks to {csv_path}")
+
+    # Persist the pre-normalized float16 embedding matrix for mmap loading
+    if emb_batches:
+        emb_matrix = np.concatenate(emb_batches, axis=0)
+    else:
+        emb_matrix = np.empty((0, 0), dtype=np.float16)
+    np.save(EMBEDDINGS_NPY_PATH, emb_matrix)
+    print(f"✅ Saved embedding matrix {emb_matrix.shape} to {EMBEDDINGS_NPY_PATH}")
+
     if use_supabase:
-        print("Uploading to Supabase...")
-        try:
-            for j in tqdm(range(0, len(rows), BATCH_INSERT), desc="Uploading"):
-                sb.table("chunks").insert(rows[j:j + BATCH_INSERT]).execute()
-            print(f"✅ Uploaded {len(rows)} chunks to Supabase for doc_id={DOC_ID}")
-        except Exception as e:
-            if "dimensions" in str(e).lower():
-                print(f"\n⚠️  Supabase upload skipped: Table expects different embedding dimensions.")
-                print(f"   Local model produces 768-dim embeddings, but Supabase table expects 1536-dim (OpenAI).")
-                print(f"   Data is saved to CSV: {csv_path}")
-            else:
-                print(f"\n❌ Supabase upload failed: {e}")
-                raise
-    
-    print(f"🎉 Done! Processed {len(rows)} chunks")
+        if supabase_error is None:
+            print(f"✅ Uploaded {total_chunks} chunks to Supabase for doc_id={DOC_ID}")
+        elif "dimensions" in str(supabase_error).lower():
+            print(f"\n⚠️  Supabase upload skipped: Table expects different embedding dimensions.")
+            print(f"   Local model produces 768-dim embeddings, but Supabase table expects 1536-dim (OpenAI).")
+            print(f"   Data is saved to CSV: {csv_path}")
+        else:
+            print(f"\n❌ Supabase upload failed: {supabase_error}")
+            raise supabase_error
+
+    print(f"🎉 Done! Processed {total_chunks} chunks")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,7 @@
 """Configuration settings loaded from environment variables"""
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -15,6 +16,9 @@ class Settings:
     # Supabase
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    # Direct Postgres connection string (optional); enables COPY bulk loads
+    # instead of batched REST inserts
+    SUPABASE_DB_URL: str = os.getenv("SUPABASE_DB_URL", "")
     
     # Model Backend Selection
     MODEL_BACKEND: str = os.getenv("MODEL_BACKEND", "local")  # "local", "api", or "gemini"
@@ -29,6 +33,10 @@ class Settings:
     LOCAL_EMBEDDING_MODEL: str = os.getenv("LOCAL_EMBEDDING_MODEL", "all-mpnet-base-v2")
     LOCAL_EMBEDDING_DIMENSION: int = int(os.getenv("LOCAL_EMBEDDING_DIMENSION", "768"))
     EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "cpu")
+
+    # ONNX Runtime embedding (optional, faster per-query CPU inference)
+    USE_ONNX_EMBEDDER: bool = os.getenv("USE_ONNX_EMBEDDER", "False").lower() == "true"
+    ONNX_EMBEDDING_MODEL_DIR: str = os.getenv("ONNX_EMBEDDING_MODEL_DIR", "models/all-mpnet-base-v2-onnx")
     
     # API Embedding Configuration (OpenAI)
     API_EMBEDDING_MODEL: str = os.getenv("API_EMBEDDING_MODEL", "text-embedding-3-small")
@@ -64,9 +72,29 @@ class Settings:
     
     # Retrieval Configuration
     TOP_K_RESULTS: int = int(os.getenv("TOP_K_RESULTS", "5"))
+    # Approximate nearest-neighbour index (optional, needs hnswlib); pays off
+    # once the corpus grows well beyond the brute-force sweet spot
+    USE_ANN_INDEX: bool = os.getenv("USE_ANN_INDEX", "False").lower() == "true"
+    # Exact FAISS inner-product index (optional, needs faiss-cpu); used
+    # automatically when installed unless disabled
+    USE_FAISS_INDEX: bool = os.getenv("USE_FAISS_INDEX", "True").lower() == "true"
+    # FAISS storage: "flat" (exact fp32), "sq8" (int8 scalar quantization,
+    # 4x smaller), or "pq" (product quantization for very large corpora)
+    FAISS_INDEX_TYPE: str = os.getenv("FAISS_INDEX_TYPE", "flat")
+    # int8 corpus for the brute-force CPU scan (needs simsimd); 4x less
+    # memory traffic per query at a tiny cosine-precision cost
+    USE_INT8_CORPUS: bool = os.getenv("USE_INT8_CORPUS", "False").lower() == "true"
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+
+    # Progress bars: "auto" shows them only on an interactive terminal, so
+    # server/piped runs skip tqdm's per-iteration overhead entirely
+    _SHOW_PROGRESS_ENV = os.getenv("SHOW_PROGRESS", "auto").lower()
+    SHOW_PROGRESS: bool = (
+        sys.stderr.isatty() if _SHOW_PROGRESS_ENV == "auto"
+        else _SHOW_PROGRESS_ENV == "true"
+    )
     
     # Paths
     PROJECT_ROOT: Path = Path(__file__).parent.parent.parent
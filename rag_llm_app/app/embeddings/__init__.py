@@ -1,5 +1,20 @@
-from .embedder import OpenAIEmbedder
-from .local_embedder import LocalEmbedder
-from .factory import get_embedder
+"""Embedder re-exports, loaded lazily so importing one backend doesn't pull in the others"""
 
-__all__ = ["OpenAIEmbedder", "LocalEmbedder", "get_embedder"]
+from importlib import import_module
+
+_LAZY_IMPORTS = {
+    "OpenAIEmbedder": ".embedder",
+    "LocalEmbedder": ".local_embedder",
+    "get_embedder": ".factory",
+    "release_embedders": ".factory",
+}
+
+__all__ = ["OpenAIEmbedder", "LocalEmbedder", "get_embedder", "release_embedders"]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
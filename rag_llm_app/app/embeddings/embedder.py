@@ -2,9 +2,8 @@
 
 from typing import List
 from openai import OpenAI
-from tqdm import tqdm
 from app.config import settings
-from app.utils import get_logger
+from app.utils import get_logger, progress
 
 logger = get_logger(__name__)
 
@@ -56,7 +55,7 @@ class OpenAIEmbedder:
         all_embeddings = []
         
         # Process in batches
-        for i in tqdm(range(0, len(chunks), batch_size), desc="Embedding batches"):
+        for i in progress(range(0, len(chunks), batch_size), desc="Embedding batches"):
             batch = chunks[i:i + batch_size]
             
             try:
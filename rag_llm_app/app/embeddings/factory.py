@@ -1,5 +1,7 @@
 """Factory for creating embedders based on configuration"""
 
+import functools
+
 from app.config import settings
 from app.utils import get_logger
 
@@ -9,14 +11,26 @@ logger = get_logger(__name__)
 def get_embedder():
     """
     Factory function to get the appropriate embedder based on MODEL_BACKEND setting
-    
+
+    Instances are cached per (backend, model), so constructing pipelines
+    per-request reuses one loaded model instead of re-loading it each time.
+    Call release_embedders() to drop the cache on shutdown.
+
     Returns:
         Embedder instance (LocalEmbedder, OpenAIEmbedder, or GeminiEmbedder)
     """
-    backend = settings.MODEL_BACKEND
-    
+    return _cached_embedder(settings.MODEL_BACKEND, settings.EMBEDDING_MODEL)
+
+
+def release_embedders():
+    """Drop all cached embedder instances (e.g. on shutdown)"""
+    _cached_embedder.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_embedder(backend: str, model_name: str):
     logger.info(f"Creating embedder for backend: {backend}")
-    
+
     if backend == "local":
         from .local_embedder import LocalEmbedder
         return LocalEmbedder()
@@ -3,6 +3,7 @@
 import os
 import logging
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import google.generativeai as genai
 
@@ -57,33 +58,38 @@ class GeminiEmbedder:
             logger.error(f"Error embedding text: {e}")
             raise
     
-    def embed_chunks(self, chunks: List[str], batch_size: int = 100) -> List[np.ndarray]:
+    def _embed_or_zero(self, chunk: str) -> np.ndarray:
+        """Embed one chunk, falling back to a zero vector on failure"""
+        try:
+            return self.embed_text(chunk)
+        except Exception as e:
+            logger.error(f"Error embedding chunk: {e}")
+            return np.zeros(self.embedding_dimension, dtype=np.float32)
+
+    def embed_chunks(self, chunks: List[str], batch_size: int = 100, max_workers: int = 16) -> List[np.ndarray]:
         """
-        Embed multiple text chunks using Gemini
-        
+        Embed multiple text chunks using Gemini with concurrent requests
+
         Args:
             chunks: List of text chunks to embed
             batch_size: Number of chunks to process at once (Gemini API batching)
-            
+            max_workers: Number of concurrent API requests
+
         Returns:
             List of embeddings as numpy arrays
         """
         embeddings = []
         total = len(chunks)
-        
+
         for i in range(0, total, batch_size):
             batch = chunks[i:i + batch_size]
             logger.info(f"Embedding batch {i//batch_size + 1}/{(total + batch_size - 1)//batch_size}")
-            
-            for chunk in batch:
-                try:
-                    embedding = self.embed_text(chunk)
-                    embeddings.append(embedding)
-                except Exception as e:
-                    logger.error(f"Error embedding chunk: {e}")
-                    # Add zero vector as fallback
-                    embeddings.append(np.zeros(self.embedding_dimension, dtype=np.float32))
-        
+
+            # Each call is an HTTP round-trip, so overlap them; executor.map
+            # keeps the results in input order
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batch))) as executor:
+                embeddings.extend(executor.map(self._embed_or_zero, batch))
+
         logger.info(f"Successfully embedded {len(embeddings)} chunks")
         return embeddings
     
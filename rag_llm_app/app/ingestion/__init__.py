@@ -1,4 +1,4 @@
-from .loader import PDFLoader
-from .chunker import TextChunker
+from .loader import PDFLoader, PagesColumns
+from .chunker import Chunk, TextChunker
 
-__all__ = ["PDFLoader", "TextChunker"]
+__all__ = ["PDFLoader", "PagesColumns", "Chunk", "TextChunker"]
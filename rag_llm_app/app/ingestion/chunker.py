@@ -1,111 +1,244 @@
 """Text chunking with sliding window sentence splitter"""
 
+import os
 import re
+from dataclasses import dataclass
+from itertools import islice
 from typing import List, Dict
-from spacy.lang.en import English
-from tqdm import tqdm
+import numpy as np
+import spacy
 from app.config import settings
-from app.utils import get_logger
+from app.ingestion.loader import PagesColumns
+from app.utils import get_logger, progress
 
 logger = get_logger(__name__)
 
+# Missing space after a sentence seam, e.g. "diet.Protein"
+_PERIOD_CAP_RE = re.compile(r'\.([A-Z])')
+
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+
+if _HAVE_NUMBA:
+    @njit(cache=True)
+    def _clean_chunk_kernel(buf, out):
+        """Single-pass byte scan: collapse space runs, add space after '.'+capital"""
+        n = buf.shape[0]
+        j = 0
+        for i in range(n):
+            b = buf[i]
+            if b == 32:  # space: keep only the first of a run
+                if j > 0 and out[j - 1] != 32:
+                    out[j] = 32
+                    j += 1
+            elif b == 46:  # '.': insert a space when a capital follows directly
+                out[j] = 46
+                j += 1
+                if i + 1 < n and 65 <= buf[i + 1] <= 90:
+                    out[j] = 32
+                    j += 1
+            else:
+                out[j] = b
+                j += 1
+        # strip leading/trailing spaces
+        start = 0
+        while start < j and out[start] == 32:
+            start += 1
+        end = j
+        while end > start and out[end - 1] == 32:
+            end -= 1
+        return start, end
+
+
+def _clean_chunk(text: str) -> str:
+    """Normalize a joined sentence chunk (spacing and '.X' sentence seams)"""
+    if _HAVE_NUMBA:
+        buf = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        out = np.empty(buf.shape[0] * 2, dtype=np.uint8)
+        start, end = _clean_chunk_kernel(buf, out)
+        return out[start:end].tobytes().decode("utf-8")
+
+    # split()/join collapses arbitrary whitespace runs in one C-level pass
+    text = " ".join(text.split())
+    return _PERIOD_CAP_RE.sub(r'. \1', text)
+
+
+@dataclass(slots=True)
+class Chunk:
+    """One text chunk and its stats; slots avoid a per-record dict
+
+    A plain dict costs ~230 B per chunk before its values; with slots the
+    record is a fixed five-pointer layout, which matters at 10^5+ chunks.
+    """
+    page_number: int
+    sentence_chunk: str
+    chunk_char_count: int
+    chunk_word_count: int
+    chunk_token_count: float
+
 
 class TextChunker:
     """Chunk text into smaller pieces using sentence-based splitting"""
     
-    def __init__(self, chunk_size: int = None, min_token_length: int = None):
+    def __init__(
+        self,
+        chunk_size: int = None,
+        min_token_length: int = None,
+        pipe_batch_size: int = 64,
+        pipe_n_process: int = None
+    ):
         """
         Initialize the text chunker
-        
+
         Args:
             chunk_size: Number of sentences per chunk
             min_token_length: Minimum token length to keep a chunk
+            pipe_batch_size: Batch size for spaCy's nlp.pipe
+            pipe_n_process: Worker processes for nlp.pipe (default: cores - 1)
         """
         self.chunk_size = chunk_size or settings.CHUNK_SIZE
         self.min_token_length = min_token_length or settings.MIN_TOKEN_LENGTH
-        
-        # Initialize spaCy for sentence segmentation
-        self.nlp = English()
+        self.pipe_batch_size = pipe_batch_size
+        self.pipe_n_process = pipe_n_process or max(1, (os.cpu_count() or 2) - 1)
+
+        # Initialize a blank tokenizer-only pipeline for sentence segmentation;
+        # no tagger/parser/lemmatizer is ever needed here
+        self.nlp = spacy.blank("en")
         self.nlp.add_pipe("sentencizer")
-        
+        # Some PDF pages concatenate into very long texts; don't reject them
+        self.nlp.max_length = 5_000_000
+
         logger.info(f"TextChunker initialized with chunk_size={self.chunk_size}, min_token_length={self.min_token_length}")
     
-    def split_into_sentences(self, pages_and_texts: List[Dict]) -> List[Dict]:
+    def split_into_sentences(self, pages: PagesColumns) -> List[List[str]]:
         """
         Split page texts into sentences using spaCy
-        
+
         Args:
-            pages_and_texts: List of page dictionaries
-            
+            pages: Column-oriented page data from PDFLoader.load_pdf
+
         Returns:
-            Updated list with sentences added
+            One list of sentences per page, aligned with pages
         """
         logger.info("Splitting text into sentences...")
-        
-        for item in tqdm(pages_and_texts, desc="Sentence splitting"):
-            doc = self.nlp(item["text"])
-            item["sentences"] = [str(sent) for sent in doc.sents]
-            item["page_sentence_count_spacy"] = len(item["sentences"])
-        
-        return pages_and_texts
+
+        # Stream every page through one nlp.pipe call so spaCy batches the
+        # work internally and fans it out across processes; the texts column
+        # is already the iterable of strings pipe wants
+        docs = self.nlp.pipe(
+            pages.texts,
+            batch_size=self.pipe_batch_size,
+            n_process=self.pipe_n_process
+        )
+
+        return [
+            [sent.text for sent in doc.sents]
+            for doc in progress(docs, total=len(pages), desc="Sentence splitting")
+        ]
     
     @staticmethod
-    def split_list(input_list: List[str], slice_size: int) -> List[List[str]]:
+    def split_list(input_list: List[str], slice_size: int):
         """
         Splits the input_list into sublists of size slice_size
-        
+
         Args:
             input_list: List to split
             slice_size: Size of each chunk
-            
-        Returns:
-            List of sublists
+
+        Yields:
+            Sublists of up to slice_size items, without materializing them all
         """
-        return [input_list[i:i + slice_size] for i in range(0, len(input_list), slice_size)]
+        it = iter(input_list)
+        while batch := list(islice(it, slice_size)):
+            yield batch
     
-    def create_chunks(self, pages_and_texts: List[Dict]) -> List[Dict]:
+    def _make_chunk(self, page_number: int, sentence_chunk: List[str]) -> Chunk | None:
+        """Build one Chunk record, or None if it falls under the token minimum
+
+        Filtering happens before the expensive join/clean pass: the token
+        estimate is chars/4, and cleaning never grows a chunk by more than a
+        few chars, so the raw length is a safe pre-filter.
         """
-        Create chunks from sentences
-        
+        approx_chars = sum(len(s) for s in sentence_chunk)
+        if approx_chars * 0.25 <= self.min_token_length:
+            return None
+
+        # Join sentences into a chunk and clean in one pass
+        joined_sentence_chunk = _clean_chunk("".join(sentence_chunk))
+
+        # Get stats about the chunk; count separators instead of
+        # allocating a throwaway split list
+        char_count = len(joined_sentence_chunk)
+        chunk_token_count = char_count * 0.25
+        if chunk_token_count <= self.min_token_length:
+            return None
+
+        return Chunk(
+            page_number=page_number,
+            sentence_chunk=joined_sentence_chunk,
+            chunk_char_count=char_count,
+            chunk_word_count=joined_sentence_chunk.count(" ") + 1,
+            chunk_token_count=chunk_token_count,
+        )
+
+    def iter_chunks(self, pages: PagesColumns):
+        """
+        Yield chunks directly from the sentencizer stream
+
+        Sentences are consumed as spaCy emits them, so no per-page sentence
+        lists (or rejected chunks) are ever materialized, and downstream
+        stages can embed/persist chunks batch by batch without ever holding
+        the full list.
+
         Args:
-            pages_and_texts: List of page dictionaries with sentences
-            
+            pages: Column-oriented page data from PDFLoader.load_pdf
+
+        Yields:
+            Chunk records that pass the token-length filter
+        """
+        docs = self.nlp.pipe(
+            pages.texts,
+            batch_size=self.pipe_batch_size,
+            n_process=self.pipe_n_process
+        )
+
+        page_items = zip(pages.page_numbers, docs)
+        for page_number, doc in progress(page_items, total=len(pages), desc="Creating chunks"):
+            page_number = int(page_number)
+
+            buf = []
+            for sent in doc.sents:
+                buf.append(sent.text)
+                if len(buf) == self.chunk_size:
+                    chunk = self._make_chunk(page_number, buf)
+                    if chunk is not None:
+                        yield chunk
+                    buf = []
+            if buf:
+                chunk = self._make_chunk(page_number, buf)
+                if chunk is not None:
+                    yield chunk
+
+    def create_chunks(self, pages: PagesColumns) -> List[Chunk]:
+        """
+        Create chunks directly from the sentencizer stream
+
+        Materialized convenience wrapper around iter_chunks for callers that
+        need the whole list at once.
+
+        Args:
+            pages: Column-oriented page data from PDFLoader.load_pdf
+
         Returns:
-            List of chunk dictionaries
+            List of Chunk records
         """
         logger.info("Creating text chunks...")
-        
-        # First split into sentences
-        pages_and_texts = self.split_into_sentences(pages_and_texts)
-        
-        # Then create chunks
-        pages_and_chunks = []
-        
-        for item in tqdm(pages_and_texts, desc="Creating chunks"):
-            sentence_chunks = self.split_list(item["sentences"], self.chunk_size)
-            
-            for sentence_chunk in sentence_chunks:
-                chunk_dict = {}
-                chunk_dict["page_number"] = item["page_number"]
-                
-                # Join sentences into a chunk
-                joined_sentence_chunk = "".join(sentence_chunk).replace("  ", " ").strip()
-                joined_sentence_chunk = re.sub(r'\.([A-Z])', r'. \1', joined_sentence_chunk)
-                chunk_dict["sentence_chunk"] = joined_sentence_chunk
-                
-                # Get stats about the chunk
-                chunk_dict["chunk_char_count"] = len(joined_sentence_chunk)
-                chunk_dict["chunk_word_count"] = len(joined_sentence_chunk.split(" "))
-                chunk_dict["chunk_token_count"] = len(joined_sentence_chunk) / 4
-                
-                pages_and_chunks.append(chunk_dict)
-        
-        # Filter out chunks that are too small
-        filtered_chunks = [
-            chunk for chunk in pages_and_chunks 
-            if chunk["chunk_token_count"] > self.min_token_length
-        ]
-        
-        logger.info(f"Created {len(filtered_chunks)} chunks (filtered from {len(pages_and_chunks)})")
-        
+
+        filtered_chunks = list(self.iter_chunks(pages))
+
+        logger.info(f"Created {len(filtered_chunks)} chunks")
+
         return filtered_chunks
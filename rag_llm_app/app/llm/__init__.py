@@ -1,5 +1,20 @@
-from .generator import OpenAIGenerator
-from .local_generator import LocalLLMGenerator
-from .factory import get_generator
+"""Generator re-exports, loaded lazily so selecting one backend doesn't pull in the others"""
 
-__all__ = ["OpenAIGenerator", "LocalLLMGenerator", "get_generator"]
+from importlib import import_module
+
+_LAZY_IMPORTS = {
+    "OpenAIGenerator": ".generator",
+    "LocalLLMGenerator": ".local_generator",
+    "get_generator": ".factory",
+    "release_generators": ".factory",
+}
+
+__all__ = ["OpenAIGenerator", "LocalLLMGenerator", "get_generator", "release_generators"]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,7 @@
 """Factory for creating LLM generators based on configuration"""
 
+import functools
+
 from app.config import settings
 from app.utils import get_logger
 
@@ -9,14 +11,27 @@ logger = get_logger(__name__)
 def get_generator():
     """
     Factory function to get the appropriate LLM generator based on MODEL_BACKEND setting
-    
+
+    Instances are cached per (backend, model), so constructing pipelines
+    per-request reuses one loaded model instead of re-loading multi-GB
+    weights each time. Call release_generators() to drop the cache on
+    shutdown.
+
     Returns:
         Generator instance (LocalLLMGenerator, OpenAIGenerator, or GeminiGenerator)
     """
-    backend = settings.MODEL_BACKEND
-    
+    return _cached_generator(settings.MODEL_BACKEND, settings.LLM_MODEL)
+
+
+def release_generators():
+    """Drop all cached generator instances (e.g. on shutdown)"""
+    _cached_generator.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_generator(backend: str, model_name: str):
     logger.info(f"Creating LLM generator for backend: {backend}")
-    
+
     if backend == "local":
         from .local_generator import LocalLLMGenerator
         return LocalLLMGenerator()
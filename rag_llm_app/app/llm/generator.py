@@ -1,6 +1,7 @@
 """OpenAI Chat Completion generator"""
 
 from typing import List, Dict
+import httpx
 from openai import OpenAI
 from app.config import settings
 from app.utils import get_logger
@@ -21,7 +22,16 @@ class OpenAIGenerator:
         """
         self.model = model or settings.LLM_MODEL
         self.temperature = temperature or settings.LLM_TEMPERATURE
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Keep a pool of warm keep-alive connections so concurrent requests
+        # don't each pay for a TLS handshake, and retry transient failures
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            max_retries=2,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            )
+        )
         
         logger.info(f"OpenAIGenerator initialized with model: {self.model}")
     
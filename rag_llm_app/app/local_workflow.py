@@ -1,10 +1,10 @@
 """Local-only RAG workflow (matches notebook implementation)"""
 
+import csv
 import sys
 import torch
 import pandas as pd
 import numpy as np
-import ast
 from pathlib import Path
 import os
 
@@ -21,89 +21,232 @@ from app.utils import get_logger
 logger = get_logger(__name__)
 
 
-def create_local_embeddings(pdf_path: str | Path, save_csv: bool = True):
+def _read_csv_fast(path):
+    """read_csv through pyarrow's threaded C parser when available"""
+    try:
+        return pd.read_csv(path, engine="pyarrow")
+    except (ImportError, ValueError):
+        return pd.read_csv(path)
+
+
+def _batched(iterable, batch_size: int):
+    """Yield lists of up to batch_size items from any iterable"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def create_local_embeddings(pdf_path: str | Path, save_csv: bool = False, batch_size: int = 256):
     """
     Create embeddings from PDF using local models (matching notebook workflow)
-    
+
+    The pipeline streams: chunks come off the sentencizer as a generator and
+    are embedded and persisted a batch at a time, so peak memory stays at
+    roughly one batch instead of the full chunk list plus the full embedding
+    matrix plus a combined dataframe. Embeddings only ever live in the .npy
+    matrix - they are never stringified into a text column.
+
     Args:
         pdf_path: Path to PDF file
-        save_csv: Whether to save embeddings to CSV
-        
+        save_csv: Whether to also stream chunk metadata to chunks.csv
+            (embeddings stay in embeddings.npy either way)
+        batch_size: Chunks embedded and written per pipeline step
+
     Returns:
         Tuple of (embeddings_tensor, chunks_list)
     """
     logger.info("=" * 80)
     logger.info("CREATING LOCAL EMBEDDINGS (NOTEBOOK WORKFLOW)")
     logger.info("=" * 80)
-    
+
     # 1. Load PDF
     loader = PDFLoader()
     pages_and_texts = loader.load_pdf(pdf_path)
     logger.info(f"Loaded {len(pages_and_texts)} pages")
-    
-    # 2. Chunk text
+
+    # 2./3. Chunk, embed and persist in one streaming pass. Embeddings are
+    # spooled as raw float32 rows (the .npy header needs the final row count,
+    # so the file is finalized with one sequential rewrite below); chunk
+    # metadata goes straight to parquet row groups
     chunker = TextChunker()
-    chunks = chunker.create_chunks(pages_and_texts)
-    logger.info(f"Created {len(chunks)} chunks")
-    
-    # 3. Create embeddings with local model
     embedder = LocalEmbedder()
-    chunk_texts = [chunk["sentence_chunk"] for chunk in chunks]
-    embeddings_list = embedder.embed_chunks(chunk_texts, batch_size=32)
-    
-    # 4. Add embeddings to chunks
-    for chunk, embedding in zip(chunks, embeddings_list):
-        chunk["embedding"] = embedding
-    
-    # 5. Save to CSV if requested
-    if save_csv:
-        df = pd.DataFrame(chunks)
-        csv_path = Path(pdf_path).parent / "text_chunks_and_embeddings_df.csv"
-        df.to_csv(csv_path, index=False)
-        logger.info(f"Saved embeddings to {csv_path}")
-    
-    # 6. Convert to torch tensor
-    embeddings_tensor = torch.tensor(
-        np.array(embeddings_list),
-        dtype=torch.float32
-    )
-    
+
+    out_dir = Path(pdf_path).parent
+    npy_path = out_dir / "embeddings.npy"
+    parquet_path = out_dir / "chunks.parquet"
+    spool_path = out_dir / "embeddings.npy.part"
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = pq = None
+        logger.warning("pyarrow not installed; streaming chunk metadata to CSV instead")
+
+    csv_path = out_dir / "chunks.csv"
+    fieldnames = [
+        "page_number", "sentence_chunk", "chunk_char_count",
+        "chunk_word_count", "chunk_token_count",
+    ]
+
+    parquet_writer = None
+    csv_file = csv_writer = None
+    # CSV is written when parquet can't be, or additionally on request; rows
+    # stream straight from each batch - no DataFrame is ever built
+    if pq is None or save_csv:
+        csv_file = open(csv_path, "w", newline="")
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(fieldnames)
+
+    n_chunks = 0
+    dim = 0
+
+    try:
+        with open(spool_path, "wb") as spool:
+            for batch in _batched(chunker.iter_chunks(pages_and_texts), batch_size):
+                texts = [chunk.sentence_chunk for chunk in batch]
+                emb = embedder.embed_chunks(texts, batch_size=32, show_progress=False)
+                emb = np.ascontiguousarray(emb, dtype=np.float32)
+                dim = emb.shape[1]
+                emb.tofile(spool)
+
+                if pq is not None:
+                    table = pa.table({
+                        "page_number": [c.page_number for c in batch],
+                        "sentence_chunk": texts,
+                        "chunk_char_count": [c.chunk_char_count for c in batch],
+                        "chunk_word_count": [c.chunk_word_count for c in batch],
+                        "chunk_token_count": [c.chunk_token_count for c in batch],
+                    })
+                    if parquet_writer is None:
+                        parquet_writer = pq.ParquetWriter(parquet_path, table.schema)
+                    parquet_writer.write_table(table)
+                if csv_writer is not None:
+                    csv_writer.writerows(
+                        (c.page_number, c.sentence_chunk, c.chunk_char_count,
+                         c.chunk_word_count, c.chunk_token_count)
+                        for c in batch
+                    )
+                n_chunks += len(batch)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+        if csv_file is not None:
+            csv_file.close()
+
+    if not n_chunks:
+        spool_path.unlink(missing_ok=True)
+        raise ValueError(f"No chunks survived filtering for {pdf_path}")
+
+    logger.info(f"Embedded {n_chunks} chunks")
+
+    # Finalize the spool into a proper .npy: np.save streams the memmap
+    # through sequentially, so no full in-RAM copy is made
+    spooled = np.memmap(spool_path, dtype=np.float32, mode="r", shape=(n_chunks, dim))
+    np.save(npy_path, spooled)
+    del spooled
+    os.unlink(spool_path)
+    logger.info(f"Saved embeddings.npy and chunks.parquet to {out_dir}")
+
+    # Read back memory-mapped; pages fault in on demand
+    embeddings_array = np.load(npy_path, mmap_mode="r+")
+    if parquet_path.exists():
+        chunks = pd.read_parquet(parquet_path).to_dict(orient="records")
+    else:
+        chunks = pd.read_csv(csv_path).to_dict(orient="records")
+
+    # Convert to torch tensor (zero-copy view of the mmap)
+    embeddings_tensor = torch.from_numpy(embeddings_array)
+
     logger.info("=" * 80)
     logger.info("LOCAL EMBEDDING CREATION COMPLETE")
     logger.info("=" * 80)
-    
+
     return embeddings_tensor, chunks
 
 
+def load_local_embeddings_df(csv_path: str | Path):
+    """
+    Load embeddings plus columnar chunk metadata
+
+    Keeps the metadata as a DataFrame so callers can index whole columns
+    (texts, page numbers) by the integer positions top-k returns, instead
+    of materializing one Python dict per chunk.
+
+    Args:
+        csv_path: Path to embeddings CSV (binary siblings are preferred)
+
+    Returns:
+        Tuple of (embeddings_tensor, metadata DataFrame)
+    """
+    csv_path = Path(csv_path)
+    npy_path = csv_path.parent / "embeddings.npy"
+    parquet_path = csv_path.parent / "chunks.parquet"
+    meta_csv_path = csv_path.parent / "chunks.csv"
+
+    # Prefer the binary matrix plus a metadata-only table (parquet, or the
+    # streamed chunks.csv): embeddings and chunk records travel separately,
+    # so no per-row vector ever needs parsing or attaching
+    if npy_path.exists() and (parquet_path.exists() or meta_csv_path.exists()):
+        arr = np.load(npy_path, mmap_mode="r")
+        if parquet_path.exists():
+            logger.info(f"Loading embeddings from {npy_path} (+ {parquet_path.name})")
+            meta_df = pd.read_parquet(parquet_path)
+        else:
+            logger.info(f"Loading embeddings from {npy_path} (+ {meta_csv_path.name})")
+            meta_df = _read_csv_fast(meta_csv_path)
+        embeddings_tensor = torch.from_numpy(np.ascontiguousarray(arr, dtype=np.float32))
+        logger.info(f"Loaded {len(meta_df)} chunks with embeddings")
+        return embeddings_tensor, meta_df
+
+    logger.info(f"Loading embeddings from {csv_path}")
+
+    # pyarrow hands the string column over after a threaded C parse; the
+    # expensive per-row float parsing below stays in np.fromstring either way
+    df = _read_csv_fast(csv_path)
+
+    # Parse the stringified vectors with C-level number parsing straight
+    # into one pre-allocated matrix - no per-row AST walk, no list-of-arrays
+    # copy at the end
+    raw = df["embedding"].to_numpy()
+    out = np.empty((len(raw), raw[0].count(",") + 1), dtype=np.float32)
+    for i, s in enumerate(raw):
+        out[i] = np.fromstring(s[1:-1], sep=",", dtype=np.float32)
+
+    meta_df = df.drop(columns=["embedding"])
+    embeddings_tensor = torch.from_numpy(out)
+
+    # One-shot migration: persist the binary pair so the next start takes
+    # the mmap path above instead of re-parsing the stringified CSV
+    try:
+        np.save(npy_path, out)
+        meta_df.to_parquet(parquet_path, index=False)
+        logger.info(f"Migrated legacy CSV to {npy_path.name} + {parquet_path.name}")
+    except Exception as e:
+        logger.warning(f"Could not migrate CSV to binary format ({e})")
+
+    logger.info(f"Loaded {len(meta_df)} chunks with embeddings")
+
+    return embeddings_tensor, meta_df
+
+
 def load_local_embeddings(csv_path: str | Path):
     """
     Load embeddings from CSV (matching notebook workflow)
-    
+
     Args:
         csv_path: Path to embeddings CSV
-        
+
     Returns:
         Tuple of (embeddings_tensor, chunks_list)
     """
-    logger.info(f"Loading embeddings from {csv_path}")
-    
-    df = pd.read_csv(csv_path)
-    
-    # Convert embedding column back to arrays using ast.literal_eval
-    df["embedding"] = df["embedding"].apply(lambda x: np.array(ast.literal_eval(x), dtype=np.float32))
-    
-    # Convert to list of dicts
-    chunks = df.to_dict(orient="records")
-    
-    # Convert to torch tensor
-    embeddings_tensor = torch.tensor(
-        np.array(df["embedding"].tolist()),
-        dtype=torch.float32
-    )
-    
-    logger.info(f"Loaded {len(chunks)} chunks with embeddings")
-    
-    return embeddings_tensor, chunks
+    embeddings_tensor, meta_df = load_local_embeddings_df(csv_path)
+    return embeddings_tensor, meta_df.to_dict(orient="records")
 
 
 def interactive_query_local(embeddings: torch.Tensor, chunks: list):
@@ -184,13 +327,16 @@ def main():
             sys.exit(1)
         
         pdf_path = sys.argv[2]
-        embeddings, chunks = create_local_embeddings(pdf_path)
-        
+        # save_csv keeps chunks.csv alongside the parquet so the artifact
+        # set is the same whether or not pyarrow is installed (dvc.yaml
+        # declares embeddings.npy + chunks.csv as the stage outputs)
+        embeddings, chunks = create_local_embeddings(pdf_path, save_csv=True)
+
         print("\n✅ Embeddings created successfully!")
         print(f"   Embeddings shape: {embeddings.shape}")
         print(f"   Number of chunks: {len(chunks)}")
         print("\nTo query, run:")
-        print(f"python -m app.local_workflow query {Path(pdf_path).parent}/text_chunks_and_embeddings_df.csv")
+        print(f"python -m app.local_workflow query {Path(pdf_path).parent}/chunks.csv")
         
     elif command == "query":
         if len(sys.argv) < 3:
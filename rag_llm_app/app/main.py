@@ -36,7 +36,7 @@ def ingest_document(pdf_path: str | Path):
     
     # 3. Create embeddings
     embedder = OpenAIEmbedder()
-    chunk_texts = [chunk["sentence_chunk"] for chunk in chunks]
+    chunk_texts = [chunk.sentence_chunk for chunk in chunks]
     embeddings = embedder.embed_chunks(chunk_texts)
     
     # 4. Store in vector database
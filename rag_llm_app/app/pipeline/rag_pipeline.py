@@ -1,7 +1,7 @@
 """Complete RAG Pipeline connecting retrieval and generation"""
 
+import functools
 from typing import Dict, Optional
-import ast
 import numpy as np
 import pandas as pd
 import torch
@@ -32,22 +32,87 @@ class RAGPipeline:
         
         # Auto-load local embeddings when needed so downstream stages do not require manual wiring
         if self.retriever_mode == "local" and (embeddings is None or chunks is None):
+            npy_path = settings.DOCUMENTS_DIR / "embeddings.npy"
+            parquet_path = settings.DOCUMENTS_DIR / "chunks.parquet"
+            meta_csv_path = settings.DOCUMENTS_DIR / "chunks.csv"
             csv_path = settings.DOCUMENTS_DIR / "text_chunks_and_embeddings_df.csv"
-            if not csv_path.exists():
+
+            if npy_path.exists() and (parquet_path.exists() or meta_csv_path.exists()):
+                # Binary pair: one mmap'd matrix read plus a metadata scan,
+                # instead of literal_eval on every CSV row. The sidecar is
+                # parquet when pyarrow was available at ingest time and
+                # chunks.csv otherwise - same contract as
+                # load_local_embeddings_df
+                arr = np.load(npy_path, mmap_mode="r+")
+                if parquet_path.exists():
+                    chunks = pd.read_parquet(parquet_path).to_dict(orient="records")
+                else:
+                    chunks = pd.read_csv(meta_csv_path).to_dict(orient="records")
+                if torch.cuda.is_available():
+                    # Heading to VRAM anyway; materialize once for the upload
+                    embeddings = torch.from_numpy(np.ascontiguousarray(arr, dtype=np.float32))
+                else:
+                    # Keep the mmap: the OS page cache owns the bytes and rows
+                    # fault in on demand, so init touches none of them
+                    embeddings = torch.from_numpy(arr)
+                logger.info(
+                    f"Mapped {len(chunks)} chunks for local retrieval from {npy_path} "
+                    f"({arr.nbytes / 1e6:.1f} MB)"
+                )
+            elif csv_path.exists():
+                # pyarrow's threaded C parser hands the string column over
+                # quickly; fall back to the default engine when unavailable
+                try:
+                    df = pd.read_csv(csv_path, engine="pyarrow")
+                except (ImportError, ValueError):
+                    df = pd.read_csv(csv_path)
+                # C-level parse of the stringified vectors into one
+                # pre-allocated matrix instead of a per-row AST walk
+                raw = df["embedding"].to_numpy()
+                out = np.empty((len(raw), raw[0].count(",") + 1), dtype=np.float32)
+                for i, s in enumerate(raw):
+                    out[i] = np.fromstring(s[1:-1], sep=",", dtype=np.float32)
+                chunks = df.drop(columns=["embedding"]).to_dict(orient="records")
+                embeddings = torch.from_numpy(out)
+                logger.info(f"Loaded {len(chunks)} chunks for local retrieval from {csv_path}")
+            else:
                 raise FileNotFoundError(
-                    f"Local embeddings not found at {csv_path}. Run the local ingestion stage first."
+                    f"Local embeddings not found at {npy_path} or {csv_path}. Run the local ingestion stage first."
                 )
-            df = pd.read_csv(csv_path)
-            df["embedding"] = df["embedding"].apply(lambda x: np.array(ast.literal_eval(x), dtype=np.float32))
-            chunks = df.to_dict(orient="records")
-            embeddings = torch.tensor(np.array(df["embedding"].tolist()), dtype=torch.float32)
-            logger.info(f"Loaded {len(chunks)} chunks for local retrieval from {csv_path}")
         
         self.embedder = get_embedder()
         self.retriever = get_retriever(mode=self.retriever_mode, embeddings=embeddings, chunks=chunks)
         self.generator = get_generator()
-        
+
+        # Re-asked questions skip the embedding forward pass entirely; keys
+        # are normalized (stripped, lowercased) so trivial retypes still hit.
+        # Tuples make the result hashable for the cache
+        self._embed_text_cached = functools.lru_cache(maxsize=1024)(
+            lambda question: tuple(self.embedder.embed_text(question))
+        )
+
         logger.info("RAGPipeline initialized successfully")
+
+    def close(self):
+        """Release the shared embedder/generator instances
+
+        The factories cache one instance per (backend, model) so repeated
+        pipeline construction is free; call this only on real shutdown,
+        since it drops those singletons for every pipeline.
+        """
+        from app.embeddings import release_embedders
+        from app.llm import release_generators
+
+        self._embed_text_cached.cache_clear()
+        self.embedder = None
+        self.generator = None
+        release_embedders()
+        release_generators()
+        logger.info("RAGPipeline closed and model caches released")
+
+    def _embed_query(self, question: str) -> list:
+        """Embed a query through the LRU cache"""
+        return list(self._embed_text_cached(" ".join(question.lower().split())))
     
     def query(
         self,
@@ -68,8 +133,8 @@ class RAGPipeline:
         """
         logger.info(f"Processing query: {question}")
         
-        # 1. Embed the query
-        query_embedding = self.embedder.embed_text(question)
+        # 1. Embed the query (cached for repeat questions)
+        query_embedding = self._embed_query(question)
         
         # 2. Retrieve relevant documents
         documents = self.retriever.search(
@@ -94,5 +159,51 @@ class RAGPipeline:
                 "context": documents,
                 "context_text": context
             }
-        
+
         return answer
+
+    def query_many(self, questions: list, top_k: int = None) -> list:
+        """
+        Answer several questions in one batched pass
+
+        All questions are embedded in a single embed_chunks call and
+        retrieved with one batched search; generation is batched too when
+        the backend supports it.
+
+        Args:
+            questions: List of user questions
+            top_k: Number of context items to retrieve per question
+
+        Returns:
+            List of answer strings, one per question
+        """
+        if not questions:
+            return []
+
+        logger.info(f"Processing a batch of {len(questions)} queries")
+
+        # 1. Embed every question in one batched forward pass
+        query_embeddings = self.embedder.embed_chunks(questions)
+
+        # 2. Retrieve for the whole batch at once when the retriever can
+        if hasattr(self.retriever, "search_batch"):
+            document_lists = self.retriever.search_batch(query_embeddings, top_k=top_k)
+        else:
+            document_lists = [
+                self.retriever.search(query_embedding=list(emb), top_k=top_k)
+                for emb in query_embeddings
+            ]
+
+        contexts = [self.retriever.format_context(docs) for docs in document_lists]
+
+        # 3. Generate, batched where the backend offers it
+        if hasattr(self.generator, "generate_batch"):
+            answers = self.generator.generate_batch(questions, contexts)
+        else:
+            answers = [
+                self.generator.generate(query=question, context=context)
+                for question, context in zip(questions, contexts)
+            ]
+
+        logger.info("Batch query processing complete")
+        return answers
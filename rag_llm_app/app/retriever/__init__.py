@@ -1,5 +1,19 @@
-from .retriever import SupabaseRetriever
-from .local_retriever import LocalRetriever
-from .factory import get_retriever
+"""Retriever re-exports, loaded lazily so local mode doesn't import the Supabase SDK"""
+
+from importlib import import_module
+
+_LAZY_IMPORTS = {
+    "SupabaseRetriever": ".retriever",
+    "LocalRetriever": ".local_retriever",
+    "get_retriever": ".factory",
+}
 
 __all__ = ["SupabaseRetriever", "LocalRetriever", "get_retriever"]
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
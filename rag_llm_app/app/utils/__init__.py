@@ -1,3 +1,4 @@
 from .logger import get_logger
+from .progress import progress
 
-__all__ = ["get_logger"]
+__all__ = ["get_logger", "progress"]
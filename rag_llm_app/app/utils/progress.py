@@ -0,0 +1,16 @@
+"""Progress bar helper that disappears in non-interactive runs"""
+
+from tqdm import tqdm
+from app.config import settings
+
+
+def progress(iterable, **kwargs):
+    """Wrap an iterable in tqdm only when progress display is enabled
+
+    In server or piped contexts the bar is never seen but still costs a
+    clock read and string format per iteration; returning the iterable
+    unwrapped makes that overhead zero.
+    """
+    if settings.SHOW_PROGRESS:
+        return tqdm(iterable, **kwargs)
+    return iterable
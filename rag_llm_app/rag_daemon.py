@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Persistent retrieval daemon: load the models once, serve many invocations
+
+Each DVC stage (demo_retrieval, test_retrieval) otherwise re-loads the
+sentence-transformer and corpus on every run, which costs seconds before any
+query work happens. Run `python rag_daemon.py [csv_path]` once; the scripts
+connect to its Unix socket and fall back to in-process loading when no
+daemon is listening.
+
+Protocol: one newline-terminated JSON request per connection
+({"questions": [...], "top_k": k}) answered with one newline-terminated
+JSON response ({"results": [[hit, ...], ...], "corpus_size": N}).
+"""
+
+import json
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SOCKET_PATH = "/tmp/rag.sock"
+
+
+def query_daemon(questions, top_k=5, socket_path=SOCKET_PATH, timeout=60.0):
+    """Client side: send a question batch to a running daemon
+
+    Args:
+        questions: List of question strings
+        top_k: Number of hits per question
+        socket_path: Unix socket the daemon listens on
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Response dict with "results" (one hit-dict list per question) and
+        "corpus_size"
+
+    Raises:
+        OSError: When no daemon is listening on the socket
+        RuntimeError: When the daemon reports a failure
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        payload = json.dumps({"questions": list(questions), "top_k": top_k})
+        sock.sendall(payload.encode("utf-8") + b"\n")
+
+        buf = b""
+        while not buf.endswith(b"\n"):
+            data = sock.recv(65536)
+            if not data:
+                break
+            buf += data
+
+    response = json.loads(buf.decode("utf-8"))
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response
+
+
+def main():
+    from app.config import settings
+    from app.embeddings import LocalEmbedder
+    from app.local_workflow import load_local_embeddings_df
+    from app.retriever import LocalRetriever
+    from app.utils import get_logger
+
+    logger = get_logger(__name__)
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "data/documents/text_chunks_and_embeddings_df.csv"
+    embeddings_tensor, meta_df = load_local_embeddings_df(csv_path)
+    chunk_texts = meta_df["sentence_chunk"].to_numpy(dtype=object)
+    page_numbers = meta_df["page_number"].to_numpy()
+    retriever = LocalRetriever(embeddings=embeddings_tensor)
+    embedder = LocalEmbedder()
+    logger.info(
+        f"Retrieval daemon ready on {SOCKET_PATH} "
+        f"({len(chunk_texts)} chunks, backend={retriever.backend})"
+    )
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline().decode("utf-8"))
+                questions = request["questions"]
+                top_k = request.get("top_k") or settings.TOP_K_RESULTS
+
+                query_embeddings = embedder.embed_chunks(questions, show_progress=False)
+                score_mat, index_mat = retriever.search_batch_indices(query_embeddings, top_k=top_k)
+                results = [
+                    [
+                        {
+                            "page_number": int(page_numbers[idx]),
+                            "similarity": score,
+                            "id": idx,
+                            "sentence_chunk": str(chunk_texts[idx]),
+                        }
+                        for score, idx in zip(scores, indices)
+                    ]
+                    for scores, indices in zip(score_mat.tolist(), index_mat.tolist())
+                ]
+                response = {"results": results, "corpus_size": len(chunk_texts)}
+            except Exception as e:
+                logger.error(f"Daemon request failed: {e}", exc_info=True)
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+    Path(SOCKET_PATH).unlink(missing_ok=True)
+    with socketserver.ThreadingUnixStreamServer(SOCKET_PATH, Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            Path(SOCKET_PATH).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
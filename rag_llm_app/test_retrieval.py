@@ -1,49 +1,58 @@
 """Retrieval smoke test (interactive optional)"""
 
 import argparse
-import ast
 from pathlib import Path
 import sys
-import torch
-import pandas as pd
-import numpy as np
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import numpy as np
+
 from app.config import settings
 from app.embeddings import LocalEmbedder
+from app.local_workflow import load_local_embeddings_df
 from app.retriever import LocalRetriever
 from app.utils import get_logger
 
 logger = get_logger(__name__)
 
+# Single-char translate is faster than str.replace for snippet flattening
+_NL_TABLE = str.maketrans({"\n": " "})
+
 
 def load_embeddings(csv_path: str):
-    df = pd.read_csv(csv_path)
-    df["embedding"] = df["embedding"].apply(lambda x: np.array(ast.literal_eval(x), dtype=np.float32))
-    chunks = df.to_dict(orient="records")
-    embeddings_tensor = torch.tensor(np.array(df["embedding"].tolist()), dtype=torch.float32)
-    return embeddings_tensor, chunks
+    """Load via the shared binary-first loader, keeping metadata columnar
+
+    Returns the embedding tensor plus (chunk_texts, page_numbers) arrays;
+    no per-chunk Python dicts are ever materialized - the top-k integer
+    indices resolve directly into the columns.
+    """
+    embeddings_tensor, meta_df = load_local_embeddings_df(csv_path)
+    chunk_texts = meta_df["sentence_chunk"].to_numpy(dtype=object)
+    page_numbers = meta_df["page_number"].to_numpy(dtype=np.int32)
+    return embeddings_tensor, chunk_texts, page_numbers
 
 
-def run_batch(questions, retriever, embedder, out_path: Path):
-    """Run a fixed set of questions and write a brief report."""
+def run_batch(questions, hit_lists, out_path: Path):
+    """Write a brief report for a batch of answered questions
+
+    `hit_lists` holds one hit-dict list per question, in the shape both
+    rag_daemon and the in-process path below produce.
+    """
     out_path.parent.mkdir(exist_ok=True, parents=True)
+
     lines = []
-    for q in questions:
-        logger.info(f"Processing question: {q}")
-        query_embedding = embedder.embed_text(q)
-        documents = retriever.search(query_embedding, print_time=False)
+    for q, hits in zip(questions, hit_lists):
         lines.append(f"Question: {q}")
-        for i, doc in enumerate(documents, 1):
-            snippet = doc['sentence_chunk'][:180].replace("\n", " ")
-            lines.append(f"  [{i}] Page {doc['page_number']} (sim={doc['similarity']:.4f}) {snippet}...")
+        for rank, hit in enumerate(hits, 1):
+            snippet = hit["sentence_chunk"][:180].translate(_NL_TABLE)
+            lines.append(f"  [{rank}] Page {hit['page_number']} (sim={hit['similarity']:.4f}) {snippet}...")
         lines.append("")
     out_path.write_text("\n".join(lines), encoding="utf-8")
     logger.info(f"Wrote retrieval test results to {out_path}")
 
 
-def run_interactive(retriever, embedder):
+def run_interactive(retriever, embedder, chunk_texts, page_numbers):
     print("\n🤖 RAG Retrieval System Ready!")
     print("(Query-only mode - No LLM generation)\n")
     while True:
@@ -55,12 +64,15 @@ def run_interactive(retriever, embedder):
                 print("Goodbye!")
                 break
             query_embedding = embedder.embed_text(question)
-            documents = retriever.search(query_embedding, print_time=True)
-            print("\n📚 Retrieved Documents:")
-            for i, doc in enumerate(documents, 1):
-                print(f"\n[{i}] Page {doc['page_number']} (Similarity: {doc['similarity']:.4f})")
-                print(f"    {doc['sentence_chunk'][:200]}...")
-            print()
+            scores, indices = retriever.search_indices(query_embedding, print_time=True)
+            # Assemble the whole block and write it once - one syscall per
+            # answer instead of one per line
+            block = ["\n📚 Retrieved Documents:"]
+            for rank, (score, idx) in enumerate(zip(scores.tolist(), indices.tolist()), 1):
+                block.append(f"\n[{rank}] Page {page_numbers[idx]} (Similarity: {score:.4f})")
+                block.append(f"    {chunk_texts[idx][:200].translate(_NL_TABLE)}...")
+            sys.stdout.write("\n".join(block) + "\n\n")
+            sys.stdout.flush()
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
             break
@@ -76,22 +88,57 @@ def main():
     parser.add_argument("--output", default="outputs/retrieval_test_results.txt", help="Where to write batch results")
     args = parser.parse_args()
 
-    logger.info("Loading embeddings...")
-    embeddings_tensor, chunks = load_embeddings(args.csv)
-    logger.info(f"Loaded {len(chunks)} chunks")
-
-    retriever = LocalRetriever(embeddings=embeddings_tensor, chunks=chunks)
-    embedder = LocalEmbedder()
-
     if args.interactive:
-        run_interactive(retriever, embedder)
-    else:
-        default_questions = [
-            "What are the health benefits of protein?",
-            "What nutrients should a healthy diet contain?",
-            "How much water should people drink daily?",
+        logger.info("Loading embeddings...")
+        embeddings_tensor, chunk_texts, page_numbers = load_embeddings(args.csv)
+        logger.info(f"Loaded {len(chunk_texts)} chunks")
+
+        retriever = LocalRetriever(embeddings=embeddings_tensor)
+        logger.info(f"Search backend: {retriever.backend}")
+        embedder = LocalEmbedder()
+        run_interactive(retriever, embedder, chunk_texts, page_numbers)
+        return
+
+    default_questions = [
+        "What are the health benefits of protein?",
+        "What nutrients should a healthy diet contain?",
+        "How much water should people drink daily?",
+    ]
+
+    # Prefer a running rag_daemon (models already loaded); fall back to
+    # loading the corpus and models in this process when it is absent
+    try:
+        from rag_daemon import query_daemon
+        hit_lists = query_daemon(default_questions)["results"]
+        logger.info("Answered via retrieval daemon")
+    # ValueError covers json.JSONDecodeError on a truncated reply; an
+    # unhealthy daemon must fall back the same way as an absent one
+    except (OSError, RuntimeError, ValueError) as e:
+        logger.info(f"Retrieval daemon unavailable ({e}); loading in-process")
+        embeddings_tensor, chunk_texts, page_numbers = load_embeddings(args.csv)
+        logger.info(f"Loaded {len(chunk_texts)} chunks")
+
+        retriever = LocalRetriever(embeddings=embeddings_tensor)
+        logger.info(f"Search backend: {retriever.backend}")
+        embedder = LocalEmbedder()
+
+        # Embed all questions in one forward pass and score them with a
+        # single (Q, d) x (d, N) GEMM
+        query_embeddings = embedder.embed_chunks(default_questions, show_progress=False)
+        score_mat, index_mat = retriever.search_batch_indices(query_embeddings)
+        hit_lists = [
+            [
+                {
+                    "page_number": int(page_numbers[idx]),
+                    "similarity": score,
+                    "sentence_chunk": chunk_texts[idx],
+                }
+                for score, idx in zip(scores, indices)
+            ]
+            for scores, indices in zip(score_mat.tolist(), index_mat.tolist())
         ]
-        run_batch(default_questions, retriever, embedder, Path(args.output))
+
+    run_batch(default_questions, hit_lists, Path(args.output))
 
 
 if __name__ == "__main__":